@@ -1,8 +1,15 @@
+import argparse
+import glob
 import os
+import hashlib
+import shutil
 import subprocess
 import json
 import time
 import re
+import sys
+from operator import itemgetter
+from pathlib import Path
 from dotenv import load_dotenv
 import pyperclip
 from google import genai
@@ -17,71 +24,220 @@ api_key = os.getenv("GEMINI_API_KEY")
 
 if not api_key:
     print("Error: Please set your GEMINI_API_KEY in .env file")
-    exit(1)
+    sys.exit(1)
 
 client = genai.Client(api_key=api_key)
 
 MODEL_LITE = "gemini-2.5-flash-lite"
+JSON_CONFIG = types.GenerateContentConfig(response_mime_type="application/json")
+CACHE_DIR = ".cache"
+JOBNAME_SANITIZE_RE = re.compile(r"[^A-Za-z0-9_-]+")
+TAGS_ARRAY_RE = re.compile(r'"tags"\s*:\s*\[[^\]]*\]')
+LATEX_INPUT_RE = re.compile(r"\\(?:input|include)\{([^}]+)\}")
+LATEX_ERROR_RE = re.compile(r"^[^:\s]+:\d+: ")  # pdflatex -file-line-error format
+REQUESTS_PER_MINUTE = 15  # Gemini free-tier RPM for flash-lite
+BATCH_POLL_SECONDS = 30
+BATCH_DONE_STATES = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter: allows at most `rpm` calls in any 60-second window
+    and only sleeps when the next call would exceed that quota. Call timestamps
+    are kept in the cache directory, so back-to-back runs share one window.
+    The state file is advisory: it is read and written without locking, and
+    any error reading or writing it is ignored rather than blocking API calls.
+    """
+
+    def __init__(self, rpm, state_name="rate_limit.json"):
+        self.rpm = rpm
+        self.state_name = state_name
+
+    def recent_calls(self, now):
+        calls = cache_load(self.state_name)
+        if not isinstance(calls, list):
+            return []
+        return sorted(t for t in calls if isinstance(t, (int, float)) and 0 <= now - t < 60)
+
+    def acquire(self):
+        now = time.time()
+        calls = self.recent_calls(now)
+
+        if len(calls) >= self.rpm:
+            wait = 60 - (now - calls[-self.rpm])
+            if wait > 0:
+                print(f"Waiting {wait:.1f}s for API rate limits...")
+                time.sleep(wait)
+
+        now = time.time()
+        # Re-read before writing so a concurrent run's timestamps are merged, not overwritten.
+        merged = set(self.recent_calls(now)) | {t for t in calls if now - t < 60} | {now}
+        calls = sorted(merged)
+        try:
+            cache_store(self.state_name, calls[-self.rpm:])
+        except OSError:
+            pass
+
+
+rate_limiter = RateLimiter(rpm=REQUESTS_PER_MINUTE)
+
+
+def extract_json_object(raw_text, start=0):
+    """
+    Return (index, block) for the first balanced {...} block in raw_text at or
+    after start, skipping braces that appear inside string literals within the
+    block. Return (-1, None) if no complete object is found.
+    """
+    depth = 0
+    begin = -1
+    in_string = False
+    escape = False
+
+    for i in range(start, len(raw_text)):
+        ch = raw_text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            if depth:
+                in_string = True
+        elif ch == "{":
+            if depth == 0:
+                begin = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                return begin, raw_text[begin:i + 1]
+    return -1, None
 
 
 def safe_json_loads(raw_text, context_label=""):
     """
-    Try to parse JSON; if that fails, try to extract the first {...} block.
+    Try to parse JSON; if that fails, try each balanced {...} block in turn,
+    restarting from the next "{" whenever a candidate does not parse.
     Return None on failure.
     """
     try:
         return json.loads(raw_text)
     except json.JSONDecodeError:
-        match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-        if match:
+        start = 0
+        while True:
+            begin, block = extract_json_object(raw_text, start)
+            if block is None:
+                break
             try:
-                return json.loads(match.group(0))
+                return json.loads(block)
             except json.JSONDecodeError:
-                pass
+                start = begin + 1
     print(f"[WARN] Failed to parse JSON for {context_label}")
     return None
 
 
-def read_resume(file_path):
+def generate_json(prompt, context_label="", on_chunk=None):
+    """
+    Request a JSON response from the model and return the parsed JSON or None.
+    With on_chunk, the response is streamed and on_chunk(text_so_far) is called
+    after each chunk (used for progress output); otherwise a plain request is made.
+    """
+    rate_limiter.acquire()
+    if not on_chunk:
+        response = client.models.generate_content(
+            model=MODEL_LITE,
+            contents=prompt,
+            config=JSON_CONFIG,
+        )
+        return safe_json_loads(response.text or "", context_label=context_label)
+
+    stream = client.models.generate_content_stream(
+        model=MODEL_LITE,
+        contents=prompt,
+        config=JSON_CONFIG,
+    )
+
+    buffer = ""
+    for chunk in stream:
+        if not chunk.text:
+            continue
+        buffer += chunk.text
+        on_chunk(buffer)
+
+    return safe_json_loads(buffer, context_label=context_label)
+
+
+def content_hash(text):
+    """Return a hex digest identifying text for the current model."""
+    return hashlib.sha256(f"{MODEL_LITE}\n{text}".encode("utf-8")).hexdigest()
+
+
+def cache_load(name):
+    """Return the cached JSON stored under name, or None if missing/unreadable."""
     try:
-        with open(file_path, "r", encoding="utf-8") as file:
-            return file.read()
-    except FileNotFoundError:
-        print(f"Error: Could not find {file_path}. Make sure it's in the same folder :( ")
-        exit(1)
+        with open(os.path.join(CACHE_DIR, name), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
 
 
-# ==========================================
-# 1. SIGNAL EXTRACTION (GENERALIZED)
-# ==========================================
+def cache_store(name, data):
+    """Atomically write data as JSON under name in the cache directory."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
 
-def extract_signal_weights(jd):
-    print("\n[1/4] Extracting and weighting JD signals...")
 
-    clusters = [
-        "backend",
-        "frontend",
-        "fullstack",
-        "data_ml",
-        "cloud_devops",
-        "testing_quality",
-        "performance_scalability",
-        "security_reliability",
-        "product_user_focus",
-        "teamwork_communication",
-        "learning_growth",
-        "domain_industry",
-    ]
+def cache_result(name, data):
+    """Best-effort cache_store for model results: warn instead of failing the run."""
+    try:
+        cache_store(name, data)
+    except OSError as exc:
+        print(f"[WARN] Could not write {name} to {CACHE_DIR}/: {exc}")
 
-    cluster_list_str = ", ".join(clusters)
 
-    prompt = f"""
-You are an expert job description analyzer.
+def read_resume(file_path):
+    try:
+        return Path(file_path).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        print(f"Error: Could not find {file_path}. Make sure it's in the same folder :( ")
+        sys.exit(1)
 
-Analyze the following Job Description and identify how strongly it emphasizes each of these signal clusters:
-[{cluster_list_str}]
 
-Definitions:
+# ==========================================
+# SHARED SIGNAL TAXONOMY
+# ==========================================
+
+SIGNAL_CLUSTERS = [
+    "backend",
+    "frontend",
+    "fullstack",
+    "data_ml",
+    "cloud_devops",
+    "testing_quality",
+    "performance_scalability",
+    "security_reliability",
+    "product_user_focus",
+    "teamwork_communication",
+    "learning_growth",
+    "domain_industry",
+]
+
+# Shared by the JD analysis prompts and emitted once per prompt. Too small (well under the
+# 1,024-token minimum) for Gemini explicit context caching to apply.
+CLUSTER_DEFINITIONS = """Definitions:
 - backend: server-side logic, APIs, databases, services
 - frontend: UI, UX, web or mobile interfaces
 - fullstack: end-to-end ownership across frontend and backend
@@ -93,7 +249,91 @@ Definitions:
 - product_user_focus: user needs, UX, customer impact, domain workflows
 - teamwork_communication: collaboration, communication, culture, cross-functional work
 - learning_growth: onboarding, mentorship, training, continuous improvement
-- domain_industry: specific industry or domain (e.g., K-12, healthcare, finance, etc.)
+- domain_industry: specific industry or domain (e.g., K-12, healthcare, finance, etc.)"""
+
+CLUSTER_FIELDS = {
+    "cluster_list": ", ".join(SIGNAL_CLUSTERS),
+    "cluster_definitions": CLUSTER_DEFINITIONS,
+}
+
+
+def normalize_jd_signals(data):
+    """
+    Fill in missing JD-signal keys. Return None if data is unusable, i.e. it
+    has no non-empty "signal_weights" object.
+    """
+    if not isinstance(data, dict):
+        return None
+    weights = data.get("signal_weights")
+    if not isinstance(weights, dict) or not weights:
+        return None
+    for key in ("top_5_signals", "top_keywords", "domain_phrases"):
+        data[key] = string_list(data.get(key))
+    return data
+
+
+def string_list(value):
+    """Return the string items of value if it is a list, else []."""
+    if not isinstance(value, list):
+        return []
+    return [item for item in value if isinstance(item, str)]
+
+
+def clean_tagged_bullets(items):
+    """
+    Keep only well-formed {"bullet_text": str, "tags": [str, ...]} entries.
+    Used on model responses and cache hits alike, so a malformed response is
+    never cached and an old bad cache entry cannot break later runs.
+    """
+    if not isinstance(items, list):
+        return []
+    cleaned = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        text = item.get("bullet_text")
+        tags = item.get("tags")
+        if not isinstance(text, str) or not text.strip() or not isinstance(tags, list):
+            continue
+        cleaned.append({"bullet_text": text, "tags": string_list(tags)})
+    return cleaned
+
+
+def normalize_tagged_bullets(data):
+    """Return the validated tagged_bullets list from a model response, or [] if unusable."""
+    if not isinstance(data, dict):
+        return []
+    return clean_tagged_bullets(data.get("tagged_bullets"))
+
+
+def bullet_progress_reporter():
+    """
+    Return an on_chunk callback for generate_json that prints how many
+    bullets have been tagged so far, by counting completed "tags": [...]
+    arrays in the streamed text. Its .count attribute holds the total.
+    """
+    def report(text):
+        for match in TAGS_ARRAY_RE.finditer(text, report.scanned):
+            report.count += 1
+            report.scanned = match.end()
+            print(f"      ...{report.count} bullets tagged", end="\r", flush=True)
+
+    report.count = 0
+    report.scanned = 0
+    return report
+
+
+# ==========================================
+# 1. SIGNAL EXTRACTION (GENERALIZED)
+# ==========================================
+
+SIGNALS_PROMPT = """
+You are an expert job description analyzer.
+
+Analyze the following Job Description and identify how strongly it emphasizes each of these signal clusters:
+[{cluster_list}]
+
+{cluster_definitions}
 
 Weighting Rules (1-10 scale):
 - Required skills/core tasks: 8-10
@@ -112,22 +352,23 @@ Job Description:
 {jd}
 """
 
-    response = client.models.generate_content(
-        model=MODEL_LITE,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json"
-        ),
-    )
 
-    data = safe_json_loads(response.text, context_label="JD signals")
+def extract_signal_weights(jd):
+    print("\n[1/4] Extracting and weighting JD signals...")
+
+    cache_name = f"signals_{content_hash(jd)}.json"
+    cached = normalize_jd_signals(cache_load(cache_name))
+    if cached:
+        print("      (using cached JD signals)")
+        return cached
+
+    prompt = SIGNALS_PROMPT.format_map({**CLUSTER_FIELDS, "jd": jd})
+
+    data = normalize_jd_signals(generate_json(prompt, context_label="JD signals"))
     if not data:
         return None
 
-    data.setdefault("signal_weights", {})
-    data.setdefault("top_5_signals", [])
-    data.setdefault("top_keywords", [])
-    data.setdefault("domain_phrases", [])
+    cache_result(cache_name, data)
     return data
 
 
@@ -135,32 +376,13 @@ Job Description:
 # 2. RESUME BULLET TAGGING
 # ==========================================
 
-def tag_resume_bullets(resume_content):
-    print("[2/4] Semantically tagging resume bullets...")
-
-    clusters = [
-        "backend",
-        "frontend",
-        "fullstack",
-        "data_ml",
-        "cloud_devops",
-        "testing_quality",
-        "performance_scalability",
-        "security_reliability",
-        "product_user_focus",
-        "teamwork_communication",
-        "learning_growth",
-        "domain_industry",
-    ]
-    cluster_list_str = ", ".join(clusters)
-
-    prompt = f"""
+TAGGING_PROMPT = """
 You are analyzing a LaTeX resume that uses \\resumeItem{{...}} for bullet points.
 
 Task:
 1. Extract EVERY bullet point (the text inside \\resumeItem{{...}}).
 2. For each bullet, assign 1 to 3 relevant signal clusters from this exact list:
-   [{cluster_list_str}]
+   [{cluster_list}]
 
 Return a STRICT JSON object with this shape:
 {{
@@ -177,53 +399,114 @@ LaTeX Resume:
 {resume_content}
 """
 
-    response = client.models.generate_content(
-        model=MODEL_LITE,
-        contents=prompt,
-        config=types.GenerateContentConfig(
-            response_mime_type="application/json"
-        ),
-    )
 
-    data = safe_json_loads(response.text, context_label="bullet tagging")
-    if not data:
-        return []
+def tag_resume_bullets(resume_content):
+    print("[2/4] Semantically tagging resume bullets...")
 
-    tagged = data.get("tagged_bullets", [])
-    if not isinstance(tagged, list):
-        return []
+    cache_name = f"bullets_{content_hash(resume_content)}.json"
+    cached = clean_tagged_bullets(cache_load(cache_name))
+    if cached:
+        print("      (using cached bullet tags)")
+        return cached
+
+    prompt = TAGGING_PROMPT.format_map({**CLUSTER_FIELDS, "resume_content": resume_content})
+
+    report_progress = bullet_progress_reporter()
+    data = generate_json(prompt, context_label="bullet tagging", on_chunk=report_progress)
+    if report_progress.count:
+        print()
+
+    tagged = normalize_tagged_bullets(data)
+    if tagged:
+        cache_result(cache_name, tagged)
     return tagged
 
 
 # ==========================================
-# 3. DYNAMIC SCORING & ADJUSTMENT
+# 1+2. COMBINED SIGNAL EXTRACTION & TAGGING
 # ==========================================
 
-def score_and_adjust_bullets(jd, jd_signals, tagged_bullets, resume_content):
-    print("[3/4] Computing dynamic alignment scores and executing LaTeX adjustments...")
+ANALYSIS_PROMPT = """
+You are an expert job description analyzer and resume reviewer.
 
-    scored_bullets = []
-    weights = jd_signals.get("signal_weights", {}) or {}
+Signal clusters:
+[{cluster_list}]
 
-    for bullet in tagged_bullets:
-        tags = bullet.get("tags", []) or []
-        score = sum(int(weights.get(tag, 0)) for tag in tags)
-        scored_bullets.append(
-            {
-                "bullet_text": bullet.get("bullet_text", ""),
-                "tags": tags,
-                "alignment_score": score,
-            }
-        )
+{cluster_definitions}
 
-    scored_bullets.sort(key=lambda x: x["alignment_score"], reverse=True)
-    bullets_context = json.dumps(scored_bullets, indent=2)
+TASK A - Job Description signals:
+Identify how strongly the Job Description emphasizes each signal cluster.
 
-    top_signals = ", ".join(jd_signals.get("top_5_signals", []))
-    top_keywords = ", ".join(jd_signals.get("top_keywords", []))
-    domain_phrases = ", ".join(jd_signals.get("domain_phrases", []))
+Weighting Rules (1-10 scale):
+- Required skills/core tasks: 8-10
+- Day-to-day responsibilities: 5-7
+- Preferred/Bonus skills: 3-4
+- Not mentioned / irrelevant: 0-1
+
+TASK B - Resume bullet tagging:
+The LaTeX resume uses \\resumeItem{{...}} for bullet points.
+1. Extract EVERY bullet point (the text inside \\resumeItem{{...}}).
+2. For each bullet, assign 1 to 3 relevant signal clusters from the exact list above.
+
+Return a STRICT JSON object with these keys:
+- "signal_weights": object mapping cluster names to integer weights (0-10).
+- "top_5_signals": list of the 5 highest-weighted clusters (strings).
+- "top_keywords": list of the 10 most critical hard skills/technologies (strings).
+- "domain_phrases": list of up to 5 short phrases describing industry, users, or mission
+    (e.g., "K-12 schools", "students and teachers", "school administrators", "healthcare providers").
+- "tagged_bullets": list of objects shaped like
+    {{"bullet_text": "The exact original text inside \\resumeItem{{...}}", "tags": ["cluster1", "cluster2"]}}
+
+Job Description:
+{jd}
+
+LaTeX Resume:
+{resume_content}
+"""
+
+
+def analyze_jd_and_resume(jd, resume_content):
+    """
+    Extract JD signals and tag resume bullets in a single model call.
+    Falls back to the individual steps when one of the results is already cached.
+    Return (jd_signals, tagged_bullets).
+    """
+    signals_cache = f"signals_{content_hash(jd)}.json"
+    bullets_cache = f"bullets_{content_hash(resume_content)}.json"
+
+    cached_bullets = cache_load(bullets_cache)
+    has_signals = normalize_jd_signals(cache_load(signals_cache)) is not None
+    has_bullets = bool(clean_tagged_bullets(cached_bullets))
+
+    if has_signals or has_bullets:
+        return extract_signal_weights(jd), tag_resume_bullets(resume_content)
 
-    prompt = f"""
+    print("\n[1-2/4] Extracting JD signals and tagging resume bullets...")
+
+    prompt = ANALYSIS_PROMPT.format_map(
+        {**CLUSTER_FIELDS, "jd": jd, "resume_content": resume_content}
+    )
+
+    report_progress = bullet_progress_reporter()
+    data = generate_json(prompt, context_label="JD signals + bullet tagging", on_chunk=report_progress)
+    if report_progress.count:
+        print()
+
+    tagged = normalize_tagged_bullets(data)
+    jd_signals = normalize_jd_signals(data)
+    if jd_signals:
+        jd_signals.pop("tagged_bullets", None)
+        cache_result(signals_cache, jd_signals)
+    if tagged:
+        cache_result(bullets_cache, tagged)
+    return jd_signals, tagged
+
+
+# ==========================================
+# 3. DYNAMIC SCORING & ADJUSTMENT
+# ==========================================
+
+TAILORING_PROMPT = """
 You are an elite resume-tailoring engine.
 
 I am providing:
@@ -233,7 +516,8 @@ I am providing:
 - The raw LaTeX resume
 
 Your task:
-Rewrite the \\resumeItem{{...}} bullets in the LaTeX code to better align with the Job Description signals, while staying 100% truthful.
+Rewrite the \\resumeItem{{...}} bullets to better align with the Job Description signals, while staying 100% truthful.
+Only the bullet text changes; the rest of the LaTeX resume is kept as-is.
 
 SCORING CONTEXT:
 You will see a JSON list of bullets with:
@@ -242,7 +526,7 @@ You will see a JSON list of bullets with:
 - "alignment_score" (integer)
 
 DYNAMIC SCORING DIRECTIVES:
-- High-Scoring Bullets: Keep them, optionally move slightly higher within their section, and expand meaningful technical depth where useful.
+- High-Scoring Bullets: Keep them and expand meaningful technical depth where useful.
 - Low-Scoring Bullets: Compress aggressively (around 15–18 words), or reframe them to more strongly touch on a Top 5 Signal *only if authentic*.
 
 KEYWORD & DOMAIN ALIGNMENT:
@@ -282,12 +566,22 @@ NON-WORDY ENFORCEMENT:
 - Tone: Remove filler ("leveraged", "utilized", "cutting-edge", "comprehensive"). Prefer concrete verbs.
 - Formatting: Bold 2–3 highly relevant keywords in each bullet using \\textbf{{...}}.
 
-LATEX SAFETY:
-- Return ONLY raw LaTeX. No markdown, no explanations, no backticks.
-- Preserve section order.
-- Do NOT add or remove sections.
-- Ensure "Technical Skills" and "Education" sections appear exactly once.
-- Keep the same LaTeX structure (\\section, \\resumeSubheading, \\resumeItem, etc.).
+OUTPUT FORMAT:
+Return a STRICT JSON object with this shape:
+{{
+  "rewrites": [
+    {{
+      "original": "The exact text inside one \\resumeItem{{...}} of the Current LaTeX Resume",
+      "rewritten": "The new LaTeX text to place inside \\resumeItem{{...}}"
+    }},
+    ...
+  ]
+}}
+- "original" must be copied from a \\resumeItem{{...}} body in the Current LaTeX Resume, character for character.
+  Use the Scored Bullets Context only as guidance for which bullets to change; it may be empty or incomplete.
+- "rewritten" is only the bullet body: do NOT include \\resumeItem itself.
+- Only include bullets you actually changed.
+- Keep the result valid LaTeX (escape %, &, $, #, _ as in the original).
 
 Scored Bullets Context (JSON):
 {bullets_context}
@@ -296,62 +590,384 @@ Current LaTeX Resume:
 {resume_content}
 """
 
-    response = client.models.generate_content(
-        model=MODEL_LITE,
-        contents=prompt,
+
+def coerce_weight(value):
+    """Return a signal weight as an int, treating non-numeric values (None, "8/10") as 0."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def build_tailoring_prompt(jd_signals, tagged_bullets, resume_content):
+    """Score tagged bullets against the JD signal weights and render the step-3 prompt."""
+    scored_bullets = []
+    weights = {k: coerce_weight(v) for k, v in (jd_signals.get("signal_weights") or {}).items()}
+
+    for bullet in tagged_bullets:
+        tags = bullet.get("tags", []) or []
+        score = sum(weights.get(tag, 0) for tag in tags)
+        scored_bullets.append(
+            {
+                "bullet_text": bullet.get("bullet_text", ""),
+                "tags": tags,
+                "alignment_score": score,
+            }
+        )
+
+    scored_bullets.sort(key=itemgetter("alignment_score"), reverse=True)
+    bullets_context = json.dumps(scored_bullets, separators=(",", ":"), ensure_ascii=False)
+
+    top_signals = ", ".join(jd_signals.get("top_5_signals", []))
+    top_keywords = ", ".join(jd_signals.get("top_keywords", []))
+    domain_phrases = ", ".join(jd_signals.get("domain_phrases", []))
+
+    return TAILORING_PROMPT.format_map(
+        {
+            "top_signals": top_signals,
+            "top_keywords": top_keywords,
+            "domain_phrases": domain_phrases,
+            "bullets_context": bullets_context,
+            "resume_content": resume_content,
+        }
     )
 
-    clean_text = response.text or ""
 
-    match = re.search(r"\\documentclass.*?\\end\{document\}", clean_text, re.DOTALL)
-    if match:
-        clean_text = match.group(0)
+def parse_rewrites(data):
+    """Return the rewrites list from a step-3 model response, or [] if unusable."""
+    rewrites = data.get("rewrites", []) if isinstance(data, dict) else []
+    if not isinstance(rewrites, list):
+        return []
+    return rewrites
+
+
+def score_and_adjust_bullets(jd, jd_signals, tagged_bullets, resume_content):
+    print("[3/4] Computing dynamic alignment scores and executing LaTeX adjustments...")
+
+    prompt = build_tailoring_prompt(jd_signals, tagged_bullets, resume_content)
+    data = generate_json(prompt, context_label="bullet rewrites")
+    return apply_bullet_rewrites(resume_content, parse_rewrites(data))
 
-    clean_text = clean_text.replace("```latex", "").replace("```", "").strip()
-    return clean_text
+
+def apply_bullet_rewrites(resume_content, rewrites):
+    """
+    Splice {"original", "rewritten"} pairs into the LaTeX resume in a single
+    regex pass. Only bodies of \\resumeItem{...} are replaced, so text elsewhere
+    is untouched and one rewrite can never be matched by another's original.
+    """
+    replacements = {}
+    for pair in rewrites:
+        if not isinstance(pair, dict):
+            continue
+        original = pair.get("original")
+        rewritten = pair.get("rewritten")
+        if not isinstance(original, str) or not isinstance(rewritten, str):
+            continue
+        if original and rewritten and original != rewritten:
+            replacements[original] = rewritten
+
+    if not replacements:
+        print("[WARN] No bullet rewrites returned. Resume is unchanged.")
+        return resume_content
+
+    alternatives = "|".join(re.escape(original) for original in sorted(replacements, key=len, reverse=True))
+    pattern = re.compile(rf"(\\resumeItem\{{\s*)({alternatives})(\s*\}})")
+    matched = set()
+
+    def splice(match):
+        matched.add(match.group(2))
+        return match.group(1) + replacements[match.group(2)] + match.group(3)
+
+    tailored, count = pattern.subn(splice, resume_content)
+
+    missing = len(replacements) - len(matched)
+    if missing:
+        print(f"[WARN] {missing} rewritten bullet(s) did not match any \\resumeItem and were skipped.")
+    print(f"Applied {count} bullet rewrite(s).")
+    return tailored
 
 
 # ==========================================
 # 4. LATEX COMPILATION
 # ==========================================
 
+def latex_log_errors(log_filename, tail=20):
+    """Return the file:line: error lines from a pdflatex log, or its last lines if none match."""
+    try:
+        with open(log_filename, "r", encoding="utf-8", errors="replace") as file:
+            lines = file.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+    errors = [line for line in lines if LATEX_ERROR_RE.match(line)]
+    return errors or lines[-tail:]
+
+
+def latex_build_hash(latex_content):
+    """
+    Return a cache key for a pdflatex build: the LaTeX source plus the local
+    .cls/.sty files, any \\input/\\include'd files, and the pdflatex binary's
+    path and mtime, so changing any of them invalidates the cached PDF.
+    Packages updated in the TeX tree itself are not tracked; clear .cache/ after that.
+    """
+    hasher = hashlib.sha256(latex_content.encode("utf-8"))
+
+    deps = set(glob.glob("*.cls")) | set(glob.glob("*.sty"))
+    for name in LATEX_INPUT_RE.findall(latex_content):
+        name = name.strip()
+        deps.add(name if os.path.splitext(name)[1] else f"{name}.tex")
+
+    for dep in sorted(deps):
+        try:
+            with open(dep, "rb") as file:
+                content = file.read()
+        except OSError:
+            continue
+        hasher.update(f"\0{dep}\0".encode("utf-8"))
+        hasher.update(content)
+
+    pdflatex = shutil.which("pdflatex")
+    if pdflatex:
+        pdflatex = os.path.realpath(pdflatex)
+        hasher.update(f"\0{pdflatex}\0{os.stat(pdflatex).st_mtime_ns}".encode("utf-8"))
+
+    return hasher.hexdigest()
+
+
+def resume_jobname(company_name):
+    """Return the pdflatex jobname (output file stem) for a company."""
+    clean_cn = JOBNAME_SANITIZE_RE.sub("-", company_name.strip())
+    return f"resume_{clean_cn}"
+
+
 def compile_latex(latex_content, company_name):
     tex_filename = "tailored_resume.tex"
-    clean_cn = re.sub(r"[^A-Za-z0-9_-]+", "-", company_name.strip())
-    jobname = f"resume_{clean_cn}"
+    jobname = resume_jobname(company_name)
 
     print(f"\n[4/4] Saving and Compiling LaTeX to {jobname}.pdf...")
 
     with open(tex_filename, "w", encoding="utf-8") as file:
         file.write(latex_content)
 
+    pdf_filename = f"{jobname}.pdf"
+    latex_hash = latex_build_hash(latex_content)
+    cached_pdf = os.path.join(CACHE_DIR, f"pdf_{latex_hash}.pdf")
+    if os.path.exists(cached_pdf):
+        shutil.copyfile(cached_pdf, pdf_filename)
+        print(f"Success! Your optimized resume is ready (unchanged, reused cached build): {pdf_filename}")
+        return
+
+    # The resume has no TOC or cross-references, so a single pass is enough.
     try:
         process = subprocess.run(
-            ["pdflatex", "-interaction=nonstopmode", f"-jobname={jobname}", tex_filename],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+            [
+                "pdflatex",
+                "-interaction=nonstopmode",
+                "-file-line-error",
+                f"-jobname={jobname}",
+                tex_filename,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
         if process.returncode == 0:
-            print(f"Success! Your optimized resume is ready: {jobname}.pdf")
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                shutil.copyfile(pdf_filename, cached_pdf)
+            except OSError as exc:
+                print(f"[WARN] Could not cache the PDF build in {CACHE_DIR}/: {exc}")
+            print(f"Success! Your optimized resume is ready: {pdf_filename}")
         else:
             print("Warning: pdflatex finished with potential formatting issues. Check the PDF.")
+            for line in latex_log_errors(f"{jobname}.log"):
+                print(f"  {line}")
 
-        for ext in [".aux", ".log", ".out"]:
-            file_to_rm = f"{jobname}{ext}"
-            if os.path.exists(file_to_rm):
-                os.remove(file_to_rm)
+        for ext in (".aux", ".log", ".out"):
+            try:
+                os.remove(f"{jobname}{ext}")
+            except FileNotFoundError:
+                pass
 
     except FileNotFoundError:
         print("\nError: Could not find 'pdflatex' command. Is LaTeX installed and on PATH?")
 
 
 # ==========================================
-# 5. MAIN FLOW
+# 5. BATCH MODE (MULTI-COMPANY)
+# ==========================================
+
+def read_batch_rows(file_path):
+    """Read {"company": ..., "jd": ...} rows from a JSON Lines file."""
+    rows = []
+    jobnames = {}
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            for line_no, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"[WARN] Skipping line {line_no}: not valid JSON.")
+                    continue
+                if not isinstance(row, dict):
+                    print(f"[WARN] Skipping line {line_no}: expected a JSON object.")
+                    continue
+                company, jd = row.get("company"), row.get("jd")
+                if not isinstance(company, str) or not company.strip() or not isinstance(jd, str) or not jd.strip():
+                    print(f"[WARN] Skipping line {line_no}: needs non-empty string 'company' and 'jd'.")
+                    continue
+
+                jobname = resume_jobname(company)
+                if jobname in jobnames:
+                    print(
+                        f"[WARN] Line {line_no}: '{company}' and '{jobnames[jobname]}' both compile to "
+                        f"{jobname}.pdf; the later one will overwrite the earlier."
+                    )
+                jobnames.setdefault(jobname, company)
+                rows.append(row)
+    except FileNotFoundError:
+        print(f"Error: Could not find {file_path}.")
+        sys.exit(1)
+    return rows
+
+
+def run_batch_job(prompts, display_name):
+    """
+    Submit prompts as one Gemini Batch job of inline JSON requests and wait for it.
+    Return the response texts in the same order (None for failed requests).
+    """
+    inline_requests = [
+        {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "config": {"response_mime_type": "application/json"},
+        }
+        for prompt in prompts
+    ]
+
+    job = client.batches.create(
+        model=MODEL_LITE,
+        src=inline_requests,
+        config={"display_name": display_name},
+    )
+    print(f"Submitted batch job {job.name} ({len(prompts)} requests). Waiting for results...")
+
+    while job.state.name not in BATCH_DONE_STATES:
+        time.sleep(BATCH_POLL_SECONDS)
+        job = client.batches.get(name=job.name)
+        print(f"  ...{job.state.name}")
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        print(f"[WARN] Batch job {job.name} finished with state {job.state.name}.")
+        return [None] * len(prompts)
+
+    texts = []
+    for inline_response in job.dest.inlined_responses:
+        if inline_response.response:
+            texts.append(inline_response.response.text)
+        else:
+            texts.append(None)
+    return texts
+
+
+def run_batch(file_path):
+    """Tailor resume.tex to every company in a JSON Lines file using the Batch API."""
+    rows = read_batch_rows(file_path)
+    if not rows:
+        print("Error: No usable rows found in the batch file.")
+        sys.exit(1)
+
+    base_resume = read_resume("resume.tex")
+    print(f"Loaded {len(rows)} job descriptions from {file_path}.")
+
+    bullets_cache = f"bullets_{content_hash(base_resume)}.json"
+    tagged_bullets = clean_tagged_bullets(cache_load(bullets_cache))
+    if not tagged_bullets:
+        tagged_bullets = None
+
+    # Steps 1 & 2: one signals request per uncached JD, plus one tagging request
+    # for the shared resume while its bullet tags are not cached yet.
+    signals_by_row = {}
+    pending = []
+    for index, row in enumerate(rows):
+        cached = normalize_jd_signals(cache_load(f"signals_{content_hash(row['jd'])}.json"))
+        if cached:
+            signals_by_row[index] = cached
+        else:
+            pending.append(index)
+
+    prompts = [
+        SIGNALS_PROMPT.format_map({**CLUSTER_FIELDS, "jd": rows[index]["jd"]})
+        for index in pending
+    ]
+    if not tagged_bullets:
+        prompts.append(TAGGING_PROMPT.format_map({**CLUSTER_FIELDS, "resume_content": base_resume}))
+
+    if prompts:
+        print("\n[1-2/4] Extracting JD signals and tagging resume bullets in batch...")
+        texts = run_batch_job(prompts, display_name="autoresume-analysis")
+
+        for index, text in zip(pending, texts):
+            company = rows[index]["company"]
+            data = safe_json_loads(text or "", context_label=f"{company} JD signals")
+            jd_signals = normalize_jd_signals(data)
+            if not jd_signals:
+                continue
+            cache_result(f"signals_{content_hash(rows[index]['jd'])}.json", jd_signals)
+            signals_by_row[index] = jd_signals
+
+        if not tagged_bullets:
+            data = safe_json_loads(texts[-1] or "", context_label="bullet tagging")
+            tagged_bullets = normalize_tagged_bullets(data)
+            if tagged_bullets:
+                cache_result(bullets_cache, tagged_bullets)
+
+    if not tagged_bullets:
+        print("[WARN] No tagged bullets returned. Tailoring will be more generic.")
+        tagged_bullets = []
+
+    # Step 3: one rewrite request per company with usable signals
+    ready = [index for index in range(len(rows)) if index in signals_by_row]
+    for index in range(len(rows)):
+        if index not in signals_by_row:
+            print(f"[WARN] Skipping {rows[index]['company']}: failed to extract JD signals.")
+    if not ready:
+        print("Error: Failed to extract JD signals for every company.")
+        sys.exit(1)
+
+    print("\n[3/4] Computing alignment scores and rewriting bullets in batch...")
+    prompts = [
+        build_tailoring_prompt(signals_by_row[index], tagged_bullets, base_resume)
+        for index in ready
+    ]
+    texts = run_batch_job(prompts, display_name="autoresume-tailoring")
+
+    for index, text in zip(ready, texts):
+        company = rows[index]["company"]
+        print(f"\n--- {company} ---")
+        data = safe_json_loads(text or "", context_label=f"{company} bullet rewrites")
+        tailored_resume = apply_bullet_rewrites(base_resume, parse_rewrites(data))
+        compile_latex(tailored_resume, company)
+
+
+# ==========================================
+# 6. MAIN FLOW
 # ==========================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Tailor resume.tex to a job description.")
+    parser.add_argument(
+        "--batch",
+        metavar="JDS_JSONL",
+        help='JSON Lines file of {"company": ..., "jd": ...} rows to tailor via the Gemini Batch API',
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch)
+        return
+
     print("Welcome to the Dynamic Signal Resume Optimization Engine")
     print("-" * 55)
 
@@ -364,15 +980,17 @@ def main():
     jd = pyperclip.paste()
     if not jd.strip():
         print("Error: Clipboard is empty.")
-        exit(1)
+        sys.exit(1)
 
     print(f"Captured {len(jd.split())} words.\n")
 
-    # Step 1: Extract Signals
-    jd_signals = extract_signal_weights(jd)
+    # Steps 1 & 2: Extract Signals and Tag Bullets (single combined call)
+    base_resume = read_resume("resume.tex")
+    jd_signals, tagged_bullets = analyze_jd_and_resume(jd, base_resume)
+
     if not jd_signals:
         print("Error: Failed to extract JD signals.")
-        exit(1)
+        sys.exit(1)
 
     print("\n🎯 Dynamic JD Signals Extracted:")
     print(f" Top 5 Clusters: {', '.join(jd_signals.get('top_5_signals', []))}")
@@ -380,19 +998,9 @@ def main():
     if jd_signals.get("domain_phrases"):
         print(f" Domain Phrases: {', '.join(jd_signals.get('domain_phrases', []))}")
 
-    print("\nPausing for 10 seconds for API Rate Limits...")
-    time.sleep(10)
-
-    # Step 2: Tag Bullets
-    base_resume = read_resume("resume.tex")
-    tagged_bullets = tag_resume_bullets(base_resume)
-
     if not tagged_bullets:
         print("[WARN] No tagged bullets returned. Tailoring will be more generic.")
 
-    print("\nPausing for 10 seconds for API Rate Limits...")
-    time.sleep(10)
-
     # Step 3: Score and Adjust
     tailored_resume = score_and_adjust_bullets(jd, jd_signals, tagged_bullets, base_resume)
 